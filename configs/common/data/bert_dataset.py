@@ -36,4 +36,7 @@ dataloader.train = LazyCall(build_nlp_train_val_test_loader)(
     splits=[[949.0, 50.0, 1.0]],
     weights=[1.0],
     num_workers=4,
+    # keep the workers (and the mmap'd dataset they opened) alive across
+    # evaluation rounds instead of re-spawning them every time
+    persistent_workers=True,
 )
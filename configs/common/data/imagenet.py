@@ -82,5 +82,8 @@ dataloader.test = [
             root="./dataset", train=False, transform=test_aug, dataset_name="imagenet test set"
         ),
         num_workers=4,
+        # keep the decoding workers alive across evaluation rounds instead of
+        # re-spawning them every time
+        persistent_workers=True,
     )
 ]
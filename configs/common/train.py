@@ -17,7 +17,10 @@ train = dict(
 
     # Performance related
     amp=dict(enabled=False),  # options for Automatic Mixed Precision
-    recompute_grad=dict(enabled=False),  # options for recompute gradient
+    # options for recompute gradient, granularity can be "full" (whole transformer layer)
+    # or "mlp" (only the mlp block of each layer). "mlp" is opt-in: it keeps the attention
+    # activations, trading more memory for less recomputation, so check it fits first.
+    recompute_grad=dict(enabled=False, granularity="full"),
     # NCCL fusion threshold megabytes, set to 0 to compatible with previous version of OneFlow
     nccl_fusion_threshold_mb=16,
     # Maximum number of ops of NCCL fusion, set to 0 to compatible with previous version of OneFlow
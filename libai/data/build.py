@@ -37,6 +37,7 @@ def build_nlp_train_val_test_loader(
     seed=0,
     collate_fn=None,
     dataset_mixer=ConcatDataset,
+    **kwargs
 ):
     """
     Build nlp train_val_test dataloader, it's used for dataset lack of valid/test dataset
@@ -67,6 +68,8 @@ def build_nlp_train_val_test_loader(
             mini-batch of Tensor(s).  Used when using batched loading from a
             map-style dataset.
         dataset_mixer: function for concating list dataset.
+        kwargs: other arguments passed to every ``DataLoader``,
+            e.g. ``persistent_workers`` or ``prefetch_factor``.
     """
     # TODO: add dataset_weights sampler
     if isinstance(dataset, omegaconf.listconfig.ListConfig):
@@ -100,6 +103,7 @@ def build_nlp_train_val_test_loader(
         consumed_samples=consumed_samples,
         seed=seed,
         collate_fn=collate_fn,
+        **kwargs,
     )
 
     valid_loader = build_nlp_test_loader(
@@ -109,6 +113,7 @@ def build_nlp_train_val_test_loader(
         num_workers=num_workers,
         seed=seed,
         collate_fn=collate_fn,
+        **kwargs,
     )
 
     test_loader = build_nlp_test_loader(
@@ -118,6 +123,7 @@ def build_nlp_train_val_test_loader(
         num_workers=num_workers,
         seed=seed,
         collate_fn=collate_fn,
+        **kwargs,
     )
 
     return train_loader, valid_loader, test_loader
@@ -189,19 +195,14 @@ def build_nlp_train_loader(
         batch_sampler=sampler,
         num_workers=num_workers,
         collate_fn=trivial_batch_collator if collate_fn is None else collate_fn,
-        **kwargs,
+        **filter_dataloader_kwargs(num_workers, kwargs),
     )
 
     return dataloader, None, None
 
 
 def build_nlp_test_loader(
-    dataset,
-    test_batch_size,
-    sampler=None,
-    num_workers=4,
-    seed=0,
-    collate_fn=None,
+    dataset, test_batch_size, sampler=None, num_workers=4, seed=0, collate_fn=None, **kwargs
 ):
     """
     Build nlp test dataloader, it's used for test dataset
@@ -237,7 +238,11 @@ def build_nlp_test_loader(
             drop_last=False,
         )
     test_loader = DataLoader(
-        dataset, batch_sampler=sampler, num_workers=num_workers, collate_fn=collate_fn
+        dataset,
+        batch_sampler=sampler,
+        num_workers=num_workers,
+        collate_fn=collate_fn,
+        **filter_dataloader_kwargs(num_workers, kwargs),
     )
     return test_loader
 
@@ -310,7 +315,7 @@ def build_image_train_loader(
         batch_sampler=sampler,
         num_workers=num_workers,
         collate_fn=trivial_batch_collator if collate_fn is None else collate_fn,
-        **kwargs,
+        **filter_dataloader_kwargs(num_workers, kwargs),
     )
     # Bind up mixup_func to dataloader, and this will be used in Trainer.step
     dataloader.mixup_func = mixup_func
@@ -359,10 +364,23 @@ def build_image_test_loader(
         batch_sampler=sampler,
         num_workers=num_workers,
         collate_fn=trivial_batch_collator if collate_fn is None else collate_fn,
-        **kwargs,
+        **filter_dataloader_kwargs(num_workers, kwargs),
     )
 
 
+def filter_dataloader_kwargs(num_workers, kwargs):
+    """
+    Drop the ``DataLoader`` options that are only valid for multi-process loading
+    when ``num_workers`` is 0, so that a config can switch to loading in the main
+    process (e.g. for debugging) without removing them.
+    """
+    if num_workers == 0:
+        kwargs = {
+            k: v for k, v in kwargs.items() if k not in ("persistent_workers", "prefetch_factor")
+        }
+    return kwargs
+
+
 def trivial_batch_collator(batch):
     assert isinstance(batch[0], Instance), "batch[0] must be `instance` for trivial batch collator"
     batch = Instance.stack(batch)
@@ -505,10 +505,9 @@ class MMapIndexedDataset(flow.utils.data.Dataset):
                 raise ValueError("Slices into indexed_dataset must be contiguous")
             ptr = self._index._pointers[start]
             sizes = self._index._sizes[idx]
-            offsets = list(accumulate(sizes))
-            total_size = sum(sizes)
+            offsets = np.cumsum(sizes)
             np_array = np.frombuffer(
-                self._bin_buffer, dtype=self._index.dtype, count=total_size, offset=ptr
+                self._bin_buffer, dtype=self._index.dtype, count=int(sizes.sum()), offset=ptr
             )
             sents = np.split(np_array, offsets[:-1])
             return sents
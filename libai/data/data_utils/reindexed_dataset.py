@@ -110,13 +110,21 @@ class SentenceIndexedDataset(flow.utils.data.Dataset):
             self.short_seq_prob,
             self.binary_head,
         )
+        # Keep the columns of the mapping as separate views, so that each lookup is a
+        # scalar fetch instead of building a row array and unpacking it.
+        self.start_indices = self.samples_mapping[:, 0]
+        self.end_indices = self.samples_mapping[:, 1]
+        self.seq_lengths = self.samples_mapping[:, 2]
 
     def __len__(self):
         return self.samples_mapping.shape[0]
 
     def __getitem__(self, idx):
-        start_idx, end_idx, seq_length = self.samples_mapping[idx]
-        sample = [self.indexed_dataset[i] for i in range(start_idx, end_idx)]
+        start_idx = self.start_indices[idx]
+        end_idx = self.end_indices[idx]
+        seq_length = self.seq_lengths[idx]
+        # The sentences of a sample are contiguous, read them with a single slice.
+        sample = self.indexed_dataset[start_idx:end_idx]
         assert seq_length <= self.max_seq_length
         return sample
 
@@ -125,10 +133,12 @@ class SentenceIndexedDataset(flow.utils.data.Dataset):
         return self.indexed_dataset.supports_prefetch
 
     def prefetch(self, indices):
-        new_indices = []
-        for idx in indices:
-            start_idx, end_idx, _ = self.samples_mapping[idx]
-            new_indices.extend([i for i in range(start_idx, end_idx)])
+        indices = np.asarray(indices, dtype=np.int64)
+        new_indices = [
+            i
+            for start_idx, end_idx in zip(self.start_indices[indices], self.end_indices[indices])
+            for i in range(start_idx, end_idx)
+        ]
         self.indexed_dataset.prefetch(new_indices)
 
 
@@ -16,6 +16,7 @@
 
 import collections
 import math
+from functools import lru_cache
 
 import numpy as np
 import oneflow as flow
@@ -35,6 +36,59 @@ def is_start_piece(piece):
     return not piece.startswith("##")
 
 
+@lru_cache(maxsize=8)
+def get_ngram_distribution(max_ngrams, favor_longer_ngram=False):
+    """Return the ngram sizes ``1..max_ngrams`` and the cumulative distribution to sample them.
+
+    Both only depend on the arguments, so they are computed once and shared by
+    all samples. The arrays are read-only since they are cached.
+    The cdf is built the same way as in ``RandomState.choice``, so
+    ``ngrams[cdf.searchsorted(np_rng.random(), side="right")]`` draws the same
+    value as ``np_rng.choice(ngrams, p=pvals)`` without its per-call checks.
+    """
+    ngrams = np.arange(1, max_ngrams + 1, dtype=np.int64)
+    # By default, we set the probilities to favor shorter ngram sequences.
+    pvals = 1.0 / np.arange(1, max_ngrams + 1)
+    pvals /= pvals.sum(keepdims=True)
+    if favor_longer_ngram:
+        pvals = pvals[::-1]
+    pvals = pvals / pvals.sum(keepdims=True)
+    cdf = pvals.cumsum()
+    cdf /= cdf[-1]
+    ngrams.setflags(write=False)
+    cdf.setflags(write=False)
+    return ngrams, cdf
+
+
+def get_candidate_groups(special_mask, start_piece_mask, do_whole_word_mask=True):
+    """Group the maskable positions of a sample into whole-word candidates.
+
+    The groups are returned in a flat layout: ``positions`` holds the candidate
+    positions in order and group ``i`` is ``positions[offsets[i]:offsets[i + 1]]``,
+    so an ngram of ``n`` groups starting at ``i`` is a single contiguous slice.
+
+    Args:
+        special_mask: bool array, True for [CLS]/[SEP] which are never masked.
+        start_piece_mask: bool array, True for tokens that start a new word.
+        do_whole_word_mask: group the word pieces of a word into one candidate.
+    """
+    positions = np.flatnonzero(~special_mask)
+    if do_whole_word_mask:
+        is_group_start = start_piece_mask[positions]
+        # Whole Word Masking means that if we mask all of the wordpieces
+        # corresponding to an original word. The first piece always opens a
+        # group, even if it is a continuation piece.
+        #
+        # Note that Whole Word Masking does *not* change the training code
+        # at all -- we still predict each WordPiece independently, softmaxed
+        # over the entire vocabulary.
+        is_group_start[:1] = True
+    else:
+        is_group_start = np.ones(len(positions), dtype=np.bool_)
+    offsets = np.append(np.flatnonzero(is_group_start), len(positions))
+    return positions, offsets
+
+
 class BertDataset(flow.utils.data.Dataset):
     """Dataset containing sentence pairs for BERT training.
     Each index corresponds to a randomly generated sentence pair.
@@ -49,6 +103,9 @@ class BertDataset(flow.utils.data.Dataset):
         short_seq_prob: Probability of producing a short sequence. Defaults to 0.0.
         max_preds_per_seq: Maximum number of mask tokens in each sentence. Defaults to None.
         seed: Seed for random number generator for reproducibility. Defaults to 1234.
+            Every sample draws from its own ``RandomState(seed + idx)``, so the
+            samples do not depend on the global numpy state nor on which
+            dataloader worker builds them.
         binary_head: Specifies whether the underlying dataset
             generates a pair of blocks along with a sentence_target or not.
             Setting it to True assumes that the underlying dataset generates a
@@ -69,6 +126,7 @@ class BertDataset(flow.utils.data.Dataset):
         binary_head=True,
     ):
         self.seed = seed
+        self._np_rng = np.random.RandomState(seed)
         self.mask_lm_prob = mask_lm_prob
         self.max_seq_length = max_seq_length
         self.short_seq_prob = short_seq_prob
@@ -86,11 +144,23 @@ class BertDataset(flow.utils.data.Dataset):
         )
 
         self.tokenizer = tokenizer
-        self.vocab_id_list = list(tokenizer.get_vocab().values())
+        self.vocab_id_arr = np.fromiter(tokenizer.get_vocab().values(), dtype=np.int64)
         self.cls_id = tokenizer.cls_token_id
         self.sep_id = tokenizer.sep_token_id
         self.mask_id = tokenizer.mask_token_id
         self.pad_id = tokenizer.pad_token_id
+        self._pad_template = np.full(self.max_seq_length, self.pad_id, dtype=np.int64)
+
+        # NOTE: ids in [len(tokenizer), 2 * len(tokenizer)) are the "##" sub-pieces
+        # used by chinese whole word masking, see `BertTokenizer._convert_token_to_id`.
+        self.is_start_piece_by_id = np.fromiter(
+            (
+                is_start_piece(tokenizer._convert_id_to_token(token_id))
+                for token_id in range(2 * len(tokenizer))
+            ),
+            dtype=np.bool_,
+            count=2 * len(tokenizer),
+        )
 
     def __len__(self):
         return len(self.dataset)
@@ -99,17 +169,19 @@ class BertDataset(flow.utils.data.Dataset):
         # Note that this rng state should be numpy and not python since
         # python randint is inclusive whereas the numpy one is exclusive.
         # We % 2 ** 32 since numpy requres the seed to be between 0 and 2 ** 32 - 1
-        np_rng = np.random.RandomState(seed=((self.seed + idx) % 2 ** 32))
+        # The RandomState is reseeded in place, which yields the same stream as a new
+        # `RandomState(seed)` without allocating one for every sample. Each dataloader
+        # worker works on its own copy of the dataset, so it is not shared.
+        np_rng = self._np_rng
+        np_rng.seed((self.seed + idx) % 2 ** 32)
 
         sents = self.dataset[idx]
 
         if self.binary_head:
             tokens_a, tokens_b, is_next_random = self.create_random_sentence_pair(sents, np_rng)
         else:
-            tokens_a = []
-            for j in range(len(sents)):
-                tokens_a.extend(sents[j])
-            tokens_b = []
+            tokens_a = np.concatenate(sents)
+            tokens_b = np.empty(0, dtype=tokens_a.dtype)
             is_next_random = False
 
         tokens_a, tokens_b = self.truncate_seq_pair(
@@ -126,14 +198,16 @@ class BertDataset(flow.utils.data.Dataset):
             labels,
             padding_mask,
             loss_mask,
-        ) = self.pad_and_convert_to_tensor(tokens, token_types, masked_positions, masked_labels)
+        ) = self.pad_and_convert_to_numpy(tokens, token_types, masked_positions, masked_labels)
 
+        # The fields are kept as numpy arrays, they are turned into tensors once per
+        # batch by `DistTensorData.stack` when the samples are collated.
         sample = Instance(
             input_ids=DistTensorData(tokens),
             attention_mask=DistTensorData(padding_mask),
             tokentype_ids=DistTensorData(token_types),
             ns_labels=DistTensorData(
-                flow.tensor(int(is_next_random), dtype=flow.long), placement_idx=-1
+                np.array(int(is_next_random), dtype=np.int64), placement_idx=-1
             ),
             lm_labels=DistTensorData(labels, placement_idx=-1),
             loss_mask=DistTensorData(loss_mask, placement_idx=-1),
@@ -147,14 +221,10 @@ class BertDataset(flow.utils.data.Dataset):
         a_end = 1
         if num_sentences >= 3:
             a_end = np_rng.randint(1, num_sentences)
-        tokens_a = []
-        for j in range(a_end):
-            tokens_a.extend(sample[j])
-
-        tokens_b = []
-
-        for j in range(a_end, num_sentences):
-            tokens_b.extend(sample[j])
+        # Join all the sentences once, both segments are views into the result.
+        tokens = np.concatenate(sample)
+        len_a = sum(len(sentence) for sentence in sample[:a_end])
+        tokens_a, tokens_b = tokens[:len_a], tokens[len_a:]
 
         is_next_random = False
         if np_rng.random() < 0.5:
@@ -167,51 +237,52 @@ class BertDataset(flow.utils.data.Dataset):
         """truncate sequence pair to a maximum sequence length"""
 
         len_a, len_b = len(tokens_a), len(tokens_b)
-        while True:
-            total_length = len_a + len_b
-            if total_length <= max_num_tokens:
-                break
+        num_to_trim = len_a + len_b - max_num_tokens
+        if num_to_trim <= 0:
+            return tokens_a, tokens_b
+
+        # The longer segment loses one token per step, either from the front or the
+        # back. Only count the trimmed tokens here and slice each segment once at the end.
+        trim_front = np_rng.random(num_to_trim) < 0.5
+        trim_a = np.zeros(num_to_trim, dtype=np.bool_)
+        for i in range(num_to_trim):
             if len_a > len_b:
-                trunc_tokens = tokens_a
+                trim_a[i] = True
                 len_a -= 1
             else:
-                trunc_tokens = tokens_b
                 len_b -= 1
 
-            if np_rng.random() < 0.5:
-                trunc_tokens.pop(0)  # remove the first element
-            else:
-                trunc_tokens.pop()  # remove the last element
+        a_front = np.count_nonzero(trim_a & trim_front)
+        b_front = np.count_nonzero(~trim_a & trim_front)
+        tokens_a = tokens_a[a_front : a_front + len_a]
+        tokens_b = tokens_b[b_front : b_front + len_b]
 
         return tokens_a, tokens_b
 
     def create_tokens_and_token_types(self, tokens_a, tokens_b):
         """merge segments A and B, add [CLS] and [SEP] and build token types."""
-        tokens = [self.cls_id] + tokens_a + [self.sep_id]
-        token_types = [0] * (len(tokens_a) + 2)
         if len(tokens_b) > 0:
-            tokens = tokens + tokens_b + [self.sep_id]
-            token_types = token_types + [1] * (len(tokens_b) + 1)
+            tokens = np.concatenate(
+                ([self.cls_id], tokens_a, [self.sep_id], tokens_b, [self.sep_id])
+            )
+            token_types = np.repeat([0, 1], [len(tokens_a) + 2, len(tokens_b) + 1])
+        else:
+            tokens = np.concatenate(([self.cls_id], tokens_a, [self.sep_id]))
+            token_types = np.zeros(len(tokens_a) + 2, dtype=np.int64)
 
         return tokens, token_types
 
-    def mask_token(self, idx, tokens, np_rng):
+    def mask_tokens(self, tokens, positions, np_rng):
         """
-        helper function to mask `idx` token from `tokens` according to
-        section 3.3.1 of https://arxiv.org/pdf/1810.04805.pdf
+        helper function to mask `positions` of `tokens` in place according to
+        section 3.3.1 of https://arxiv.org/pdf/1810.04805.pdf: 80% of them are
+        replaced by [MASK], 10% by a random token and 10% are left unchanged.
         """
-        label = tokens[idx]
-        if np_rng.random() < 0.8:
-            new_label = self.mask_id
-        else:
-            if np_rng.random() < 0.5:
-                new_label = label
-            else:
-                new_label = np_rng.choice(self.vocab_id_list)
-
-        tokens[idx] = new_label
-
-        return label
+        probs = np_rng.random(len(positions))
+        tokens[positions[probs < 0.8]] = self.mask_id
+        random_positions = positions[probs >= 0.9]
+        random_ids = np_rng.randint(0, len(self.vocab_id_arr), len(random_positions))
+        tokens[random_positions] = self.vocab_id_arr[random_ids]
 
     def create_masked_lm_predictions(
         self,
@@ -225,138 +296,79 @@ class BertDataset(flow.utils.data.Dataset):
         """Creates the predictions for the masked LM objective.
         Note: Tokens here are vocab ids and not text tokens."""
 
-        cand_indexes = []
-        token_boundary = [0] * len(tokens)
-        new_tokens = []
-
-        for (i, token) in enumerate(tokens):
-            new_tokens.append(token % len(self.tokenizer))
-
-            if token == self.cls_id or token == self.sep_id:
-                token_boundary[i] = 1
-                continue
-            # Whole Word Masking means that if we mask all of the wordpieces
-            # corresponding to an original word.
-            #
-            # Note that Whole Word Masking does *not* change the training code
-            # at all -- we still predict each WordPiece independently, softmaxed
-            # over the entire vocabulary.
-            if (
-                do_whole_word_mask
-                and len(cand_indexes) >= 1
-                and not is_start_piece(self.tokenizer._convert_id_to_token(token))
-            ):
-                cand_indexes[-1].append(i)
-            else:
-                cand_indexes.append([i])
-                if is_start_piece(self.tokenizer._convert_id_to_token(token)):
-                    token_boundary[i] = 1
-
-        tokens = new_tokens
+        tokens = np.asarray(tokens, dtype=np.int64)
+        start_piece_mask = self.is_start_piece_by_id[tokens]
+        tokens = tokens % len(self.tokenizer)
+        special_mask = (tokens == self.cls_id) | (tokens == self.sep_id)
 
         masked_positions = []
         masked_labels = []
 
-        output_tokens = list(tokens)
+        output_tokens = tokens.copy()
 
         if self.mask_lm_prob == 0:
             return output_tokens, masked_positions, masked_labels
 
-        cand_indexes = []
-        for (i, token) in enumerate(tokens):
-            if token == self.cls_id or token == self.sep_id:
-                continue
-            # Whole Word Masking means that if we mask all of the wordpieces
-            # corresponding to an original word.
-            #
-            # Note that Whole Word Masking does *not* change the training code
-            # at all -- we still predict each WordPiece independently, softmaxed
-            # over the entire vocabulary.
-            if do_whole_word_mask and len(cand_indexes) >= 1 and token_boundary[i] == 0:
-                cand_indexes[-1].append(i)
-            else:
-                cand_indexes.append([i])
+        cand_positions, cand_offsets = get_candidate_groups(
+            special_mask, start_piece_mask, do_whole_word_mask
+        )
+        num_groups = len(cand_offsets) - 1
 
         num_to_predict = min(
             self.max_preds_per_seq, max(1, int(round(len(tokens) * self.mask_lm_prob)))
         )
 
-        ngrams = np.arange(1, max_ngrams + 1, dtype=np.int64)
         if not geometric_dist:
-            # By default, we set the probilities to favor shorter ngram sequences.
-            pvals = 1.0 / np.arange(1, max_ngrams + 1)
-            pvals /= pvals.sum(keepdims=True)
-            if favor_longer_ngram:
-                pvals = pvals[::-1]
+            ngrams, ngram_cdf = get_ngram_distribution(max_ngrams, favor_longer_ngram)
 
-        ngram_indexes = []
-        for idx in range(len(cand_indexes)):
-            ngram_index = []
-            for n in ngrams:
-                ngram_index.append(cand_indexes[idx : idx + n])
-            ngram_indexes.append(ngram_index)
-
-        np_rng.shuffle(ngram_indexes)
+        def get_ngram(start, n):
+            # Positions of the `n` consecutive groups beginning at group `start`,
+            # truncated at the end of the sequence.
+            return cand_positions[cand_offsets[start] : cand_offsets[min(start + n, num_groups)]]
 
         masked_lms = []
-        covered_indexes = set()
-        for cand_index_set in ngram_indexes:
+        covered = np.zeros(len(tokens), dtype=np.bool_)
+        # Only the order of the start groups is shuffled, the ngrams themselves are
+        # sliced out of the flat candidate positions when they are visited.
+        for start in np_rng.permutation(num_groups):
             if len(masked_lms) >= num_to_predict:
                 break
-            if not cand_index_set:
-                continue
-            # Skip current piece if they are covered in lm masking or previous ngrams.
-            for index_set in cand_index_set[0]:
-                for index in index_set:
-                    if index in covered_indexes:
-                        continue
-
             if not geometric_dist:
-                n = np_rng.choice(
-                    ngrams[: len(cand_index_set)],
-                    p=pvals[: len(cand_index_set)]
-                    / pvals[: len(cand_index_set)].sum(keepdims=True),
-                )
+                n = ngrams[ngram_cdf.searchsorted(np_rng.random(), side="right")]
             else:
                 # Sampling "n" from the geometric distribution and clipping it to
                 # the max_ngrams. Using p=0.2 default from the SpanBERT paper
                 # https://arxiv.org/pdf/1907.10529.pdf (Sec 3.1)
                 n = min(np_rng.geometric(0.2), max_ngrams)
 
-            index_set = sum(cand_index_set[n - 1], [])
-            n -= 1
+            index_set = get_ngram(start, n)
             # Repeatedly looking for a candidate that does not exceed the
             # maximum number of predictions by trying shorter ngrams.
-            while len(masked_lms) + len(index_set) > num_to_predict:
-                if n == 0:
-                    break
-                index_set = sum(cand_index_set[n - 1], [])
+            while len(masked_lms) + len(index_set) > num_to_predict and n > 1:
                 n -= 1
+                index_set = get_ngram(start, n)
             # If adding a whole-word mask would exceed the maximum number of
             # predictions, then just skip this candidate.
             if len(masked_lms) + len(index_set) > num_to_predict:
                 continue
-            is_any_index_covered = False
-            for index in index_set:
-                if index in covered_indexes:
-                    is_any_index_covered = True
-                    break
-            if is_any_index_covered:
+            # Skip current piece if they are covered in lm masking or previous ngrams.
+            if covered[index_set].any():
                 continue
+            covered[index_set] = True
             for index in index_set:
-                covered_indexes.add(index)
-                label = self.mask_token(index, output_tokens, np_rng)
-                masked_lms.append(MaskedLmInstance(index=index, label=label))
+                masked_lms.append(MaskedLmInstance(index=index, label=tokens[index]))
 
         masked_lms = sorted(masked_lms, key=lambda x: x.index)
         for p in masked_lms:
             masked_positions.append(p.index)
             masked_labels.append(p.label)
 
+        self.mask_tokens(output_tokens, np.asarray(masked_positions, dtype=np.int64), np_rng)
+
         return output_tokens, masked_positions, masked_labels
 
-    def pad_and_convert_to_tensor(self, tokens, token_types, masked_positions, masked_labels):
-        """pad sequences and convert them to tensor"""
+    def pad_and_convert_to_numpy(self, tokens, token_types, masked_positions, masked_labels):
+        """pad sequences and convert them to int64 numpy arrays"""
 
         # check
         num_tokens = len(tokens)
@@ -365,25 +377,32 @@ class BertDataset(flow.utils.data.Dataset):
         assert len(token_types) == num_tokens
         assert len(masked_positions) == len(masked_labels)
 
-        # tokens and token types
-        filler = [self.pad_id] * num_pad
-        tokens = flow.tensor(tokens + filler, dtype=flow.long)
-        token_types = flow.tensor(token_types + filler, dtype=flow.long)
+        if num_pad == 0:
+            # Full-length samples are the common case, they need no padding and
+            # the inputs are fresh arrays, so they are used as they are.
+            tokens_np = np.asarray(tokens, dtype=np.int64)
+            token_types_np = np.asarray(token_types, dtype=np.int64)
+            padding_mask_np = np.ones(self.max_seq_length, dtype=np.int64)
+        else:
+            # tokens and token types
+            tokens_np = self._pad_template.copy()
+            tokens_np[:num_tokens] = tokens
+            token_types_np = self._pad_template.copy()
+            token_types_np[:num_tokens] = token_types
 
-        # padding mask
-        padding_mask = flow.tensor([1] * num_tokens + [0] * num_pad, dtype=flow.long)
+            # padding mask
+            padding_mask_np = np.zeros(self.max_seq_length, dtype=np.int64)
+            padding_mask_np[:num_tokens] = 1
 
         # labels and loss mask
-        labels = [-1] * self.max_seq_length
-        loss_mask = [0] * self.max_seq_length
-        for idx, label in zip(masked_positions, masked_labels):
-            assert idx < num_tokens
-            labels[idx] = label
-            loss_mask[idx] = 1
-        labels = flow.tensor(labels, dtype=flow.long)
-        loss_mask = flow.tensor(loss_mask, dtype=flow.long)
-
-        return tokens, token_types, labels, padding_mask, loss_mask
+        labels_np = np.full(self.max_seq_length, -1, dtype=np.int64)
+        loss_mask_np = np.zeros(self.max_seq_length, dtype=np.int64)
+        masked_positions = np.asarray(masked_positions, dtype=np.int64)
+        assert (masked_positions < num_tokens).all()
+        labels_np[masked_positions] = masked_labels
+        loss_mask_np[masked_positions] = 1
+
+        return tokens_np, token_types_np, labels_np, padding_mask_np, loss_mask_np
 
     @property
     def supports_prefetch(self):
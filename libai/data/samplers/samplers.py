@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import numpy as np
 import oneflow as flow
 from oneflow.utils.data import Sampler
 
@@ -65,7 +66,8 @@ class CyclicSampler(Sampler):
         """
         epoch = self.consumed_samples // self.data_size_per_epoch
         current_epoch_samples = self.consumed_samples % self.data_size_per_epoch
-        batch = []
+        # indices left over from the previous epoch that did not fill a whole batch
+        remain_indices = np.empty(0, dtype=np.int64)
 
         while True:
             bucket_offset = current_epoch_samples // self.data_parallel_size
@@ -74,23 +76,24 @@ class CyclicSampler(Sampler):
             if self.shuffle:
                 generator = flow.Generator()
                 generator.manual_seed(self.seed + epoch)
-                random_idx = flow.randperm(self.data_size_per_epoch, generator=generator).tolist()
-                indices = [start_idx + x for x in random_idx[bucket_offset:]]
+                random_idx = flow.randperm(self.data_size_per_epoch, generator=generator).numpy()
             else:
-                seq_idx = flow.arange(self.data_size_per_epoch).tolist()
-                indices = [start_idx + x for x in seq_idx[bucket_offset:]]
+                random_idx = np.arange(self.data_size_per_epoch, dtype=np.int64)
+            indices = random_idx[bucket_offset:] + start_idx
 
             epoch += 1
 
             if hasattr(self.dataset, "supports_prefetch") and self.dataset.supports_prefetch:
-                self.dataset.prefetch(indices)
-
-            for idx in indices:
-                batch.append(idx)
-                if len(batch) == self.micro_batch_size:
-                    self.consumed_samples += self.actual_batch_size
-                    yield batch
-                    batch = []
+                self.dataset.prefetch(indices.tolist())
+
+            # Cut the indices into batches at once instead of appending them one by one.
+            indices = np.concatenate([remain_indices, indices])
+            num_batches = len(indices) // self.micro_batch_size
+            end = num_batches * self.micro_batch_size
+            for batch in indices[:end].reshape(num_batches, self.micro_batch_size):
+                self.consumed_samples += self.actual_batch_size
+                yield batch.tolist()
+            remain_indices = indices[end:]
 
             current_epoch_samples = 0
 
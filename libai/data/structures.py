@@ -15,8 +15,9 @@
 
 from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any, List
+from typing import Any, List, Union
 
+import numpy as np
 import oneflow as flow
 
 from libai.utils import distributed as dist
@@ -24,7 +25,8 @@ from libai.utils import distributed as dist
 
 @dataclass
 class DistTensorData:
-    tensor: flow.Tensor
+    # A np.ndarray payload is turned into a flow.Tensor by `stack` or `to_global`.
+    tensor: Union[flow.Tensor, np.ndarray]
     sbp_list: list = field(default_factory=lambda: ["split_0", "broadcast"])
     placement_idx: int = 0
 
@@ -51,33 +53,39 @@ class DistTensorData:
         else:
             self.placement = dist.get_layer_placement(self.placement_idx)
 
+        if isinstance(self.tensor, np.ndarray):
+            self.tensor = flow.tensor(self.tensor)
         self.tensor = self.tensor.to_global(sbp=self.sbp, placement=self.placement)
 
     @staticmethod
     def stack(distTensor_lists: List["DistTensorData"]) -> "DistTensorData":
-        if not isinstance(distTensor_lists[0].tensor, flow.Tensor):
+        tensor_type = type(distTensor_lists[0].tensor)
+        if not issubclass(tensor_type, (flow.Tensor, np.ndarray)):
             raise TypeError(
-                "DistTensorData.tensor must be a flow.Tensor, but got {}. "
-                "Please check the return values of `__getitem__` in dataset.".format(
-                    type(distTensor_lists[0].tensor)
-                )
+                "DistTensorData.tensor must be a flow.Tensor or a np.ndarray, but got {}. "
+                "Please check the return values of `__getitem__` in dataset.".format(tensor_type)
             )
 
         assert len(distTensor_lists) > 0
         if len(distTensor_lists) == 1:
+            if isinstance(distTensor_lists[0].tensor, np.ndarray):
+                distTensor_lists[0].tensor = flow.tensor(distTensor_lists[0].tensor)
             # TODO(l1aoxingyu): add inplace unsqueeze
             # distTensor_lists[0].tensor.unsqueeze_(0)  # add batch dim
             distTensor_lists[0].tensor = distTensor_lists[0].tensor.unsqueeze(0)  # add batch dim
             return distTensor_lists[0]
 
-        tensor_size = distTensor_lists[0].tensor.size()
+        tensor_size = tuple(distTensor_lists[0].tensor.shape)
         sbp_list = distTensor_lists[0].sbp_list
         placement_idx = distTensor_lists[0].placement_idx
         tensors = []
         for data in distTensor_lists:
+            assert isinstance(
+                data.tensor, tensor_type
+            ), f"tensor type is not equal, {type(data.tensor)} != {tensor_type}"
             assert (
-                data.tensor.size() == tensor_size
-            ), f"tensor shape is not equal, {data.tensor.size()} != {tensor_size}"
+                tuple(data.tensor.shape) == tensor_size
+            ), f"tensor shape is not equal, {tuple(data.tensor.shape)} != {tensor_size}"
             assert (
                 data.sbp_list == sbp_list
             ), f"sbp_list is not equal, {data.sbp_list} != {sbp_list}!"
@@ -85,7 +93,12 @@ class DistTensorData:
                 data.placement_idx == placement_idx
             ), f"placement_idx is not equal, {data.placement_idx} != {placement_idx}"
             tensors.append(data.tensor)
-        tensors = flow.stack(tensors, dim=0)
+        if issubclass(tensor_type, np.ndarray):
+            # Samples kept as numpy arrays are stacked on the host and turned into
+            # a single tensor, instead of creating one small tensor per sample.
+            tensors = flow.tensor(np.stack(tensors, axis=0))
+        else:
+            tensors = flow.stack(tensors, dim=0)
         ret = DistTensorData(tensors, sbp_list=sbp_list, placement_idx=placement_idx)
         return ret
 
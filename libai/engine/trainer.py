@@ -288,7 +288,9 @@ class EagerTrainer(TrainerBase):
 
         if (self.iter + 1) % self.grad_acc_steps == 0:
             self.optimizer.step()
-            self.optimizer.zero_grad()
+            # Release the gradients instead of filling them with zeros, since the next backward
+            # writes fresh ones anyway.
+            self.optimizer.zero_grad(set_to_none=True)
 
 
 class GraphTrainer(TrainerBase):
@@ -36,8 +36,9 @@ class ParallelCrossEntropyLoss(nn.Module):
         assert target.ndim == 2
         assert logits.shape[0:2] == target.shape
 
-        # Change -1 in target to 0 because sparse_softmax_cross_entropy don't accept -1
-        target = target * (target >= 0)
+        # Change -1 in target to 0 because sparse_softmax_cross_entropy don't accept -1,
+        # a single clamp instead of building a comparison mask and multiplying by it.
+        target = flow.clamp(target, min=0)
 
         lm_loss = flow._C.sparse_softmax_cross_entropy(
             logits.view(-1, logits.shape[-1]),
@@ -26,6 +26,11 @@ class Embedding(nn.Module):
     """Construct the trainable embedding module, which does not support parallelization.
     This can be used for positional embedding and token type embedding.
 
+    The ids may be a [1, s] tensor with sbp sign [B, B], such as default position ids.
+    The [1, s, h] output then broadcasts over the batch when it is added to [b, s, h]
+    embeddings. This avoids expanding the ids to the batch and resharding them, and
+    looks up each position once instead of once per token.
+
     Arguments:
         num_embeddings: size of vocabulary.
         embedding_dim: dimension of embeddings.
@@ -71,7 +76,8 @@ class Embedding(nn.Module):
 
     def forward(self, input_ids):
         # embeddings with sbp sign: [B, B]
-        #   [B, B] x [S(0), B] --> [S(0), B]
+        #   [B, B] x [S(0), B] --> [S(0), B]    ids of shape [b, s]
+        #   [B, B] x [B, B]    --> [B, B]       ids of shape [1, s], see the class docstring
         #     ↑         ↑              ↑
         #   embed    pos_ids       pos_embed
         input_embeds = flow._C.gather(self.weight, input_ids, axis=0)
@@ -22,6 +22,9 @@ from libai.utils import distributed as dist
 class LMLogits(nn.Module):
     def __init__(self, vocab_size, bias=False):
         super().__init__()
+        # NOTE: The bias is split along the vocab dim, which is the last dim of the
+        # logits, so [B, S(0)] for the (vocab_size,) bias lines up with the [S(0), S(2)]
+        # logits and the bias add needs no boxing.
         self.bias = (
             nn.Parameter(
                 flow.zeros(
@@ -57,5 +60,8 @@ class LMLogits(nn.Module):
 
         logits = flow._C.matmul(input, w, transpose_b=True)
         if self.bias is not None:
-            logits = logits + self.bias
+            # Add the bias in place, the [b, s, vocab] logits are by far the largest
+            # activation of the model and matmul does not need its output for backward,
+            # so there is no need to allocate a second copy of them.
+            logits += self.bias
         return logits
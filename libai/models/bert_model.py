@@ -34,19 +34,39 @@ from .utils import init_method_normal, scaled_init_method_normal
 
 
 class BertExtendedAttnMask(nn.Module):
+    """
+    Extend the [b, s] padding mask so that it can be applied to attention scores
+    of shape [b, num_heads, s, s].
+
+    Arguments:
+        key_padding_only: if True, only mask the padded keys and return a [b, 1, 1, s]
+            mask, which is broadcast against the scores instead of materializing a
+            [b, 1, s, s] mask read by every layer. The outputs at non-padded positions
+            are the same, since padded queries never contribute to them. The fused
+            scale-mask-softmax kernel needs the full mask, so this is only valid for
+            the unfused softmax. Defaults to False.
+    """
+
+    def __init__(self, key_padding_only=False):
+        super().__init__()
+        self.key_padding_only = key_padding_only
+
     def forward(self, attention_mask):
+        # Convert attention mask to binary first, so that the [b, s, s] outer product
+        # below is computed and stored as int8 in a single pass, like the casual mask
+        # of gpt, instead of in the input dtype followed by another comparison.
+        # [b, s]
+        attention_mask = (attention_mask > 0.5).to(flow.int8)
+
+        if self.key_padding_only:
+            # [b, 1, 1, s]
+            return attention_mask.unsqueeze(1).unsqueeze(2)
+
         # We create a 3D attention mask from a 2D tensor mask.
-        # [b, 1, s]
-        attention_mask_b1s = attention_mask.unsqueeze(1)
-        # [b, s, 1]
-        attention_mask_bs1 = attention_mask.unsqueeze(2)
-        # [b, s, s]
-        attention_mask_bss = attention_mask_b1s * attention_mask_bs1
+        # [b, 1, s] x [b, s, 1] -> [b, s, s]
+        attention_mask_bss = attention_mask.unsqueeze(1) * attention_mask.unsqueeze(2)
         # [b, 1, s, s]
         extended_attention_mask = attention_mask_bss.unsqueeze(1)
-
-        # Convert attention mask to binary.
-        extended_attention_mask = extended_attention_mask > 0.5
         return extended_attention_mask
 
 
@@ -96,20 +116,15 @@ class BertEmbeddings(nn.Module):
 
         word_embeddings = self.vocab_embeddings(input_ids)
         if position_ids is None:
-            # Change position_ids sbp sign: [B, B] -> [S(0), B]
-            position_ids = (
-                self.position_ids[:, :seq_length].expand_as(input_ids).to_global(sbp=input_ids.sbp)
-            )
+            # [1, s] with sbp sign [B, B], broadcast over the batch, see `Embedding`.
+            position_ids = self.position_ids[:, :seq_length]
         position_embeddings = self.position_embeddings(position_ids)
         embeddings = word_embeddings + position_embeddings
 
         if self.tokentype_embeddings is not None:
             if tokentype_ids is None:
-                tokentype_ids = (
-                    self.tokentype_ids[:, :seq_length]
-                    .expand_as(input_ids)
-                    .to_global(sbp=input_ids.sbp)
-                )
+                # Same as position_ids, [1, s] with sbp sign [B, B].
+                tokentype_ids = self.tokentype_ids[:, :seq_length]
             embeddings = embeddings + self.tokentype_embeddings(tokentype_ids)
 
         embeddings = self.embedding_dropout(embeddings)
@@ -120,22 +135,31 @@ class BertEmbeddings(nn.Module):
 
 
 class BertLMPredictionHead(nn.Module):
-    def __init__(self, hidden_size, init_method):
+    def __init__(self, hidden_size, init_method, bias_gelu_fusion=False):
         super().__init__()
+        self.bias_gelu_fusion = bias_gelu_fusion
         self.dense = Linear(
             hidden_size,
             hidden_size,
             bias=True,
             parallel="col",
+            skip_bias_add=bias_gelu_fusion,
             init_method=init_method,
             layer_idx=-1,
         )
-        self.activation_func = build_activation("gelu")
+        if not bias_gelu_fusion:
+            self.activation_func = build_activation("gelu")
         self.layernorm = LayerNorm((hidden_size,), layer_idx=-1)
 
     def forward(self, hidden_states):
         hidden_states = self.dense(hidden_states)
-        hidden_states = self.activation_func(hidden_states)
+        if self.bias_gelu_fusion:
+            hidden_states, bias = hidden_states
+            hidden_states = flow._C.fused_bias_add_gelu(
+                hidden_states, bias, axis=hidden_states.ndim - 1
+            )
+        else:
+            hidden_states = self.activation_func(hidden_states)
         hidden_states = hidden_states.to_global(
             grad_sbp=dist.get_nd_sbp([flow.sbp.split(0), flow.sbp.split(2)])
         )
@@ -206,8 +230,8 @@ class BertLoss(nn.Module):
 
         if self.add_binary_head:
             sop_loss = flow._C.cross_entropy(
-                binary_logits, ns_labels, ignore_index=-1, reduction="none"
-            ).mean()
+                binary_logits, ns_labels, ignore_index=-1, reduction="mean"
+            )
             loss_dict["sop_loss"] = sop_loss
         return loss_dict
 
@@ -252,7 +276,9 @@ class BertModel(nn.Module):
         )
 
         # Mask generation
-        self.extended_attn_mask = BertExtendedAttnMask()
+        self.extended_attn_mask = BertExtendedAttnMask(
+            key_padding_only=not scale_mask_softmax_fusion
+        )
 
         # Encoders
         self.encoders = nn.ModuleList(
@@ -329,9 +355,11 @@ class BertModel(nn.Module):
 
 
 class BertPreTrainingHeads(nn.Module):
-    def __init__(self, vocab_size, hidden_size, init_method, add_binary_head=True):
+    def __init__(
+        self, vocab_size, hidden_size, init_method, add_binary_head=True, bias_gelu_fusion=False
+    ):
         super().__init__()
-        self.predictions = BertLMPredictionHead(hidden_size, init_method)
+        self.predictions = BertLMPredictionHead(hidden_size, init_method, bias_gelu_fusion)
         self.seq_relationship = Linear(
             hidden_size,
             2,
@@ -381,6 +409,7 @@ class BertForPreTraining(nn.Module):
             cfg.hidden_size,
             init_method_normal(cfg.initializer_range),
             cfg.add_binary_head,
+            cfg.bias_gelu_fusion,
         )
 
     def forward(
@@ -438,15 +467,12 @@ class BertForPreTraining(nn.Module):
         # Set pipeline parallelism stage_id
         for module_block in model.modules():
             # module.origin can get the original module
-            if isinstance(module_block.origin, BertEmbeddings):
+            origin = module_block.origin
+            if isinstance(origin, (BertEmbeddings, BertExtendedAttnMask)):
                 module_block.config.stage_id = dist_utils.get_layer_stage_id(0)
-            elif isinstance(module_block.origin, BertExtendedAttnMask):
-                module_block.config.stage_id = dist_utils.get_layer_stage_id(0)
-            elif isinstance(module_block.origin, TransformerLayer):
+            elif isinstance(origin, TransformerLayer):
                 module_block.config.stage_id = dist_utils.get_layer_stage_id(module_block.layer_idx)
-            elif isinstance(module_block.origin, BertPooler):
-                module_block.config.stage_id = dist_utils.get_layer_stage_id(-1)
-            elif isinstance(module_block.origin, BertPreTrainingHeads):
+            elif isinstance(origin, (BertPooler, BertPreTrainingHeads)):
                 module_block.config.stage_id = dist_utils.get_layer_stage_id(-1)
 
         # Set the last layernorm stage id
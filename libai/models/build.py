@@ -49,6 +49,9 @@ def build_graph(cfg, model, optimizer=None, lr_scheduler=None, is_train=False):
         graph.lr_scheduler = lr_scheduler
         graph.fp16 = try_get_key(cfg, "train.amp.enabled", default=False)
         graph.recompute_grad = try_get_key(cfg, "train.recompute_grad.enabled", default=False)
+        graph.recompute_granularity = try_get_key(
+            cfg, "train.recompute_grad.granularity", default="full"
+        )
         graph.zero_optim = try_get_key(cfg, "train.zero_optimization.enabled", default=False)
         graph.zero_stage = try_get_key(cfg, "train.zero_optimization.stage", default=1)
         graph.grad_acc_steps = try_get_key(cfg, "train.num_accumulation_steps", default=1)
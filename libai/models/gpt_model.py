@@ -56,7 +56,16 @@ class CasualMask(nn.Module):
         if past_length > 0:
             # in case past_key_values are used, we need to add a prefix ones mask to casual mask
             casual_mask = flow.cat(
-                [flow.ones(tgt_len, past_length, dtype=flow.int8), casual_mask], dim=-1
+                [
+                    flow.ones(
+                        (tgt_len, past_length),
+                        dtype=flow.int8,
+                        placement=casual_mask.placement,
+                        sbp=casual_mask.sbp,
+                    ),
+                    casual_mask,
+                ],
+                dim=-1,
             )
         casual_mask = (
             casual_mask.unsqueeze(0).unsqueeze(1).expand(bsz, 1, tgt_len, tgt_len + past_length)
@@ -202,13 +211,15 @@ class GPTEmbedding(nn.Module):
     def forward(self, input_ids, past_length=0):
         bsz, seq_length = input_ids.size()
 
+        # positions of the new tokens only, [1, s] and broadcast over the batch below
         position_ids = self.position_ids[:, past_length : past_length + seq_length]
-        position_ids = position_ids.expand_as(input_ids).to_global(sbp=input_ids.sbp)
 
         token_embeds = self.token_embeddings(input_ids)
         position_embeds = self.position_embeddings(position_ids)
         input_embeds = token_embeds + position_embeds
-        input_embeds = self.dropout(input_embeds)
+        # Skip the no-op dropout op when embedding_dropout_prob is 0.
+        if self.dropout.p > 0:
+            input_embeds = self.dropout(input_embeds)
         return input_embeds
 
 
@@ -255,7 +266,7 @@ class Transformer(nn.Module):
     def forward(self, hidden_states, attention_mask):
         # hidden_states shape: (batch_size, seq_length, hidden_size)
         # sbp: [S(0), B]
-        for i, layer in enumerate(self.layers):
+        for layer in self.layers:
             hidden_states = layer(hidden_states, attention_mask)
 
         output = self.layernorm_f(hidden_states)
@@ -298,11 +309,13 @@ class GPTForPreTraining(nn.Module):
         dist_utils = dist.get_dist_util()
 
         for module_block in model.modules():
-            if isinstance(module_block.origin, (GPTEmbedding, CasualMask)):
+            # module.origin can get the original module
+            origin = module_block.origin
+            if isinstance(origin, (GPTEmbedding, CasualMask)):
                 module_block.config.stage_id = dist_utils.get_layer_stage_id(0)
-            elif isinstance(module_block.origin, TransformerLayer):
+            elif isinstance(origin, TransformerLayer):
                 module_block.config.stage_id = dist_utils.get_layer_stage_id(module_block.layer_idx)
-            elif isinstance(module_block.origin, (LMLogits, GPTLoss)):
+            elif isinstance(origin, (LMLogits, GPTLoss)):
                 module_block.config.stage_id = dist_utils.get_layer_stage_id(-1)
 
         model.GPT_model.transformer.layernorm_f.config.stage_id = dist_utils.get_layer_stage_id(-1)
@@ -71,10 +71,8 @@ class T5Embedding(flow.nn.Module):
         word_embeddings = self.word_embeddings(input_ids)
 
         if position_ids is None:
-            # Change position_ids sbp sign: [B, B] -> [S(0), B]
-            position_ids = (
-                self.position_ids[:, :seq_length].expand_as(input_ids).to_global(sbp=input_ids.sbp)
-            )
+            # Shared by the whole batch, see `Embedding` for why they are not expanded.
+            position_ids = self.position_ids[:, :seq_length]
         position_embeddings = self.position_embeddings(position_ids)
         embeddings = word_embeddings + position_embeddings
         embeddings = self.embedding_dropout(embeddings)
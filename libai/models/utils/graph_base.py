@@ -28,6 +28,7 @@ class GraphBase(nn.Graph):
         lr_scheduler: flow.optim.lr_scheduler = None,
         fp16=False,
         recompute_grad=False,
+        recompute_granularity="full",
         grad_acc_steps=1,
         zero_optim=False,
         zero_stage=0,
@@ -54,7 +55,7 @@ class GraphBase(nn.Graph):
                 self.config.set_gradient_accumulation_steps(grad_acc_steps)
 
             if recompute_grad:
-                self.set_activation_checkpoint()
+                self.set_activation_checkpoint(recompute_granularity)
 
             if zero_optim:
                 self.config.set_zero_redundancy_optimizer_mode("distributed_split")
@@ -86,10 +87,24 @@ class GraphBase(nn.Graph):
         else:
             return self.model(**kwargs)
 
-    def set_activation_checkpoint(self):
+    def set_activation_checkpoint(self, granularity="full"):
+        """Set activation checkpointing on the transformer blocks.
+
+        Args:
+            granularity: ``"full"`` recomputes the whole ``TransformerLayer`` in backward,
+                ``"mlp"`` only recomputes its MLP block and keeps the attention activations,
+                which trades some memory for not recomputing the attention.
+        """
+        if granularity not in ("full", "mlp"):
+            raise ValueError(
+                f"Unsupported recompute granularity {granularity}, expected 'full' or 'mlp'"
+            )
         for module_block in self.model.modules():
             if isinstance(module_block.origin, TransformerLayer):
-                module_block.config.activation_checkpointing = True
+                if granularity == "full":
+                    module_block.config.activation_checkpointing = True
+                else:
+                    module_block.mlp.config.activation_checkpointing = True
 
     def set_pipeline_stage_id(self):
         if hasattr(type(self.model.origin), "set_pipeline_stage_id"):
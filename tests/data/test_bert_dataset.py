@@ -0,0 +1,220 @@
+# coding=utf-8
+# Copyright 2021 The OneFlow Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import numpy as np
+
+from libai.data.datasets.bert_dataset import (
+    BertDataset,
+    get_candidate_groups,
+    get_ngram_distribution,
+)
+
+CLS_ID, SEP_ID, MASK_ID, PAD_ID = 1, 2, 3, 0
+VOCAB_SIZE = 100
+
+
+def build_dataset(max_seq_length=16):
+    # Only the attributes used by the sample helpers, no indexed dataset is needed.
+    dataset = BertDataset.__new__(BertDataset)
+    dataset.max_seq_length = max_seq_length
+    dataset.cls_id = CLS_ID
+    dataset.sep_id = SEP_ID
+    dataset.mask_id = MASK_ID
+    dataset.pad_id = PAD_ID
+    dataset.vocab_id_arr = np.arange(VOCAB_SIZE, dtype=np.int64)
+    dataset._pad_template = np.full(max_seq_length, PAD_ID, dtype=np.int64)
+    return dataset
+
+
+def reference_candidate_groups(special_mask, start_piece_mask, do_whole_word_mask=True):
+    # The per-token loop that get_candidate_groups replaced.
+    cand_indexes = []
+    for i in range(len(special_mask)):
+        if special_mask[i]:
+            continue
+        if do_whole_word_mask and len(cand_indexes) >= 1 and not start_piece_mask[i]:
+            cand_indexes[-1].append(i)
+        else:
+            cand_indexes.append([i])
+    return cand_indexes
+
+
+def reference_truncate_seq_pair(tokens_a, tokens_b, max_num_tokens, np_rng):
+    # The pop loop that truncate_seq_pair replaced.
+    tokens_a, tokens_b = list(tokens_a), list(tokens_b)
+    while len(tokens_a) + len(tokens_b) > max_num_tokens:
+        trunc_tokens = tokens_a if len(tokens_a) > len(tokens_b) else tokens_b
+        if np_rng.random() < 0.5:
+            trunc_tokens.pop(0)
+        else:
+            trunc_tokens.pop()
+    return tokens_a, tokens_b
+
+
+def to_groups(positions, offsets):
+    return [positions[offsets[i] : offsets[i + 1]].tolist() for i in range(len(offsets) - 1)]
+
+
+class TestCandidateGroups(unittest.TestCase):
+    def test_whole_word_groups(self):
+        # [CLS] ##a b ##c [SEP] ##d e [SEP]
+        special_mask = np.array([1, 0, 0, 0, 1, 0, 0, 1], dtype=np.bool_)
+        start_piece_mask = np.array([1, 0, 1, 0, 1, 0, 1, 1], dtype=np.bool_)
+
+        positions, offsets = get_candidate_groups(special_mask, start_piece_mask)
+        # A leading "##" piece still opens a group, and a "##" piece right after
+        # [SEP] is joined to the word before it.
+        self.assertEqual(to_groups(positions, offsets), [[1], [2, 3, 5], [6]])
+
+        positions, offsets = get_candidate_groups(
+            special_mask, start_piece_mask, do_whole_word_mask=False
+        )
+        self.assertEqual(to_groups(positions, offsets), [[1], [2], [3], [5], [6]])
+
+    def test_same_as_token_loop(self):
+        rng = np.random.RandomState(0)
+        for _ in range(200):
+            length = rng.randint(1, 40)
+            special_mask = rng.random_sample(length) < 0.2
+            start_piece_mask = rng.random_sample(length) < 0.6
+            for do_whole_word_mask in (True, False):
+                positions, offsets = get_candidate_groups(
+                    special_mask, start_piece_mask, do_whole_word_mask
+                )
+                self.assertEqual(
+                    to_groups(positions, offsets),
+                    reference_candidate_groups(special_mask, start_piece_mask, do_whole_word_mask),
+                )
+
+
+class TestNgramDistribution(unittest.TestCase):
+    def test_same_draw_as_choice(self):
+        for max_ngrams in (1, 3, 5):
+            for favor_longer_ngram in (False, True):
+                ngrams, cdf = get_ngram_distribution(max_ngrams, favor_longer_ngram)
+                pvals = 1.0 / np.arange(1, max_ngrams + 1)
+                pvals /= pvals.sum(keepdims=True)
+                if favor_longer_ngram:
+                    pvals = pvals[::-1]
+
+                for seed in range(500):
+                    expected = np.random.RandomState(seed).choice(ngrams, p=pvals)
+                    np_rng = np.random.RandomState(seed)
+                    self.assertEqual(
+                        ngrams[cdf.searchsorted(np_rng.random(), side="right")], expected
+                    )
+
+    def test_cached_and_read_only(self):
+        ngrams, cdf = get_ngram_distribution(3)
+        self.assertIs(get_ngram_distribution(3)[1], cdf)
+        self.assertFalse(ngrams.flags.writeable)
+        self.assertFalse(cdf.flags.writeable)
+
+
+class TestTruncateSeqPair(unittest.TestCase):
+    def test_same_as_pop_loop(self):
+        dataset = build_dataset()
+        rng = np.random.RandomState(0)
+        for seed in range(300):
+            tokens_a = rng.randint(0, VOCAB_SIZE, size=rng.randint(1, 30))
+            tokens_b = rng.randint(0, VOCAB_SIZE, size=rng.randint(0, 30))
+            max_num_tokens = rng.randint(1, 40)
+
+            np_rng = np.random.RandomState(seed)
+            out_a, out_b = dataset.truncate_seq_pair(tokens_a, tokens_b, max_num_tokens, np_rng)
+            ref_rng = np.random.RandomState(seed)
+            ref_a, ref_b = reference_truncate_seq_pair(tokens_a, tokens_b, max_num_tokens, ref_rng)
+
+            self.assertEqual(out_a.tolist(), ref_a)
+            self.assertEqual(out_b.tolist(), ref_b)
+            self.assertLessEqual(len(out_a) + len(out_b), max_num_tokens)
+            # Both consume the same number of draws.
+            self.assertEqual(np_rng.random(), ref_rng.random())
+
+    def test_trims_longer_segment(self):
+        dataset = build_dataset()
+        tokens_a = np.arange(10)
+        tokens_b = np.arange(4)
+        out_a, out_b = dataset.truncate_seq_pair(tokens_a, tokens_b, 10, np.random.RandomState(1))
+        self.assertEqual(len(out_a), 6)
+        self.assertEqual(out_b.tolist(), tokens_b.tolist())
+
+
+class TestMaskTokens(unittest.TestCase):
+    def test_mask_random_keep_split(self):
+        dataset = build_dataset()
+        num_tokens = 20000
+        original = np.full(num_tokens, 1000, dtype=np.int64)
+        tokens = original.copy()
+        positions = np.arange(0, num_tokens, 2, dtype=np.int64)
+
+        dataset.mask_tokens(tokens, positions, np.random.RandomState(1234))
+
+        probs = np.random.RandomState(1234).random(len(positions))
+        masked = positions[probs < 0.8]
+        kept = positions[(probs >= 0.8) & (probs < 0.9)]
+        replaced = positions[probs >= 0.9]
+        self.assertTrue((tokens[masked] == MASK_ID).all())
+        self.assertTrue((tokens[kept] == 1000).all())
+        self.assertTrue(((tokens[replaced] >= 0) & (tokens[replaced] < VOCAB_SIZE)).all())
+        # Positions that were not selected are never touched.
+        self.assertTrue((tokens[1::2] == original[1::2]).all())
+
+        self.assertAlmostEqual(len(masked) / len(positions), 0.8, delta=0.02)
+        self.assertAlmostEqual(len(kept) / len(positions), 0.1, delta=0.02)
+        self.assertAlmostEqual(len(replaced) / len(positions), 0.1, delta=0.02)
+
+
+class TestPadAndConvertToNumpy(unittest.TestCase):
+    def test_padding(self):
+        dataset = build_dataset(max_seq_length=8)
+        tokens = [CLS_ID, 10, 11, SEP_ID, 12, SEP_ID]
+        token_types = [0, 0, 0, 0, 1, 1]
+
+        outputs = dataset.pad_and_convert_to_numpy(tokens, token_types, [2, 4], [11, 12])
+        for output in outputs:
+            self.assertEqual(output.dtype, np.int64)
+            self.assertEqual(output.shape, (8,))
+        tokens_np, token_types_np, labels_np, padding_mask_np, loss_mask_np = outputs
+
+        self.assertEqual(tokens_np.tolist(), tokens + [PAD_ID] * 2)
+        self.assertEqual(token_types_np.tolist(), token_types + [PAD_ID] * 2)
+        self.assertEqual(labels_np.tolist(), [-1, -1, 11, -1, 12, -1, -1, -1])
+        self.assertEqual(padding_mask_np.tolist(), [1] * 6 + [0] * 2)
+        self.assertEqual(loss_mask_np.tolist(), [0, 0, 1, 0, 1, 0, 0, 0])
+        # The padding template is copied, not written to.
+        self.assertTrue((dataset._pad_template == PAD_ID).all())
+
+    def test_full_length(self):
+        dataset = build_dataset(max_seq_length=4)
+        tokens = np.array([CLS_ID, 10, 11, SEP_ID])
+        token_types = np.zeros(4, dtype=np.int64)
+
+        outputs = dataset.pad_and_convert_to_numpy(tokens, token_types, [1], [10])
+        for output in outputs:
+            self.assertEqual(output.dtype, np.int64)
+        tokens_np, token_types_np, labels_np, padding_mask_np, loss_mask_np = outputs
+
+        self.assertEqual(tokens_np.tolist(), tokens.tolist())
+        self.assertEqual(token_types_np.tolist(), [0, 0, 0, 0])
+        self.assertEqual(labels_np.tolist(), [-1, 10, -1, -1])
+        self.assertEqual(padding_mask_np.tolist(), [1, 1, 1, 1])
+        self.assertEqual(loss_mask_np.tolist(), [0, 1, 0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+# coding=utf-8
+# Copyright 2021 The OneFlow Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from libai.data.build import filter_dataloader_kwargs
+
+
+class TestFilterDataloaderKwargs(unittest.TestCase):
+    def test_main_process(self):
+        kwargs = dict(persistent_workers=True, prefetch_factor=4, drop_last=True)
+        self.assertEqual(filter_dataloader_kwargs(0, kwargs), dict(drop_last=True))
+        # The options of the caller are left untouched.
+        self.assertEqual(len(kwargs), 3)
+
+    def test_multi_process(self):
+        kwargs = dict(persistent_workers=True, prefetch_factor=4)
+        self.assertEqual(filter_dataloader_kwargs(4, kwargs), kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()
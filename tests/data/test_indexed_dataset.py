@@ -0,0 +1,72 @@
+# coding=utf-8
+# Copyright 2021 The OneFlow Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import oneflow as flow
+
+from libai.data.data_utils import MMapIndexedDataset
+from libai.data.data_utils.indexed_dataset import (
+    MMapIndexedDatasetBuilder,
+    data_file_path,
+    index_file_path,
+)
+
+SENTENCES = [[1, 2, 3], [4], [5, 6], [7, 8, 9, 10], [11]]
+
+
+class TestMMapIndexedDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        prefix = os.path.join(self.tmp_dir, "sentences")
+
+        builder = MMapIndexedDatasetBuilder(data_file_path(prefix), dtype=np.int64)
+        for sentence in SENTENCES:
+            builder.add_item(flow.tensor(sentence, dtype=flow.int64))
+        builder.end_document()
+        builder.finalize(index_file_path(prefix))
+
+        self.dataset = MMapIndexedDataset(prefix, skip_warmup=True)
+
+    def tearDown(self):
+        del self.dataset
+        shutil.rmtree(self.tmp_dir)
+
+    def test_getitem(self):
+        self.assertEqual(len(self.dataset), len(SENTENCES))
+        for i, sentence in enumerate(SENTENCES):
+            self.assertEqual(self.dataset[i].tolist(), sentence)
+
+    def test_slice(self):
+        for start, stop in [(0, 5), (1, 4), (3, 4), (2, 100)]:
+            sents = self.dataset[start:stop]
+            self.assertEqual([sent.tolist() for sent in sents], SENTENCES[start:stop])
+
+    def test_empty_slice(self):
+        sents = self.dataset[3:3]
+        self.assertEqual(len(sents), 1)
+        self.assertEqual(sents[0].size, 0)
+
+    def test_non_contiguous_slice(self):
+        with self.assertRaises(ValueError):
+            self.dataset[0:4:2]
+
+
+if __name__ == "__main__":
+    unittest.main()
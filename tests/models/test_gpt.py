@@ -18,12 +18,14 @@ import os
 import tempfile
 import unittest
 
+import numpy as np
 import oneflow as flow
 import oneflow.unittest
 
 from libai.config import LazyConfig
 from libai.engine import DefaultTrainer, hooks
 from libai.engine.default import _check_batch_size
+from libai.models.gpt_model import CasualMask
 from libai.utils import distributed as dist
 from libai.utils.file_utils import get_data_from_cache
 from libai.utils.logger import setup_logger
@@ -178,5 +180,27 @@ class TestGPTModel(flow.unittest.TestCase):
         trainer.train()
 
 
+class TestCasualMask(flow.unittest.TestCase):
+    @flow.unittest.skip_unless_1n1d()
+    def test_casual_mask_with_past_length(self):
+        input_ids = flow.ones(
+            (2, 3),
+            dtype=flow.long,
+            placement=dist.get_layer_placement(0),
+            sbp=dist.get_nd_sbp([flow.sbp.split(0), flow.sbp.broadcast]),
+        )
+        casual_mask = CasualMask(max_positions=8)(input_ids, past_length=4)
+
+        self.assertEqual(casual_mask.shape, (2, 1, 3, 7))
+        self.assertEqual(casual_mask.placement, input_ids.placement)
+        self.assertEqual(casual_mask.sbp, input_ids.sbp)
+
+        # Every new token attends to all the past tokens and causally to the new ones
+        expected = np.concatenate([np.ones((3, 4)), np.tril(np.ones((3, 3)))], axis=-1)
+        mask = dist.tton(casual_mask)
+        for i in range(2):
+            self.assertTrue(np.array_equal(mask[i, 0], expected))
+
+
 if __name__ == "__main__":
     unittest.main()
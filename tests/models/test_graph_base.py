@@ -0,0 +1,80 @@
+# coding=utf-8
+# Copyright 2021 The OneFlow Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import oneflow as flow
+import oneflow.unittest
+
+from libai.config import LazyConfig
+from libai.layers import MLP, TransformerLayer
+from libai.models import build_graph, build_model
+from libai.utils import distributed as dist
+
+
+class TestRecomputeGranularity(flow.unittest.TestCase):
+    def setUp(self) -> None:
+        cfg = LazyConfig.load("configs/bert_large_pretrain.py")
+
+        cfg.model.cfg.vocab_size = 128
+        cfg.model.cfg.hidden_size = 64
+        cfg.model.cfg.intermediate_size = 128
+        cfg.model.cfg.num_attention_heads = 4
+        cfg.model.cfg.hidden_layers = 2
+        cfg.model.cfg.max_position_embeddings = 32
+        cfg.train.recompute_grad.enabled = True
+
+        self.cfg = cfg
+
+    def build_train_graph(self):
+        dist.setup_dist_util(self.cfg.train.dist)
+        model = build_model(self.cfg.model)
+        optimizer = flow.optim.SGD(model.parameters(), lr=0.1)
+        lr_scheduler = flow.optim.lr_scheduler.StepLR(optimizer, step_size=1)
+        return build_graph(self.cfg, model, optimizer, lr_scheduler, is_train=True)
+
+    @flow.unittest.skip_unless_1n1d()
+    def test_mlp_granularity(self):
+        self.cfg.train.recompute_grad.granularity = "mlp"
+        graph = self.build_train_graph()
+
+        num_layers = 0
+        for module_block in graph.model.modules():
+            if isinstance(module_block.origin, TransformerLayer):
+                num_layers += 1
+                self.assertFalse(module_block.config.activation_checkpointing)
+                self.assertTrue(module_block.mlp.config.activation_checkpointing)
+            elif not isinstance(module_block.origin, MLP):
+                self.assertFalse(module_block.config.activation_checkpointing)
+        self.assertEqual(num_layers, self.cfg.model.cfg.hidden_layers)
+
+    @flow.unittest.skip_unless_1n1d()
+    def test_full_granularity(self):
+        graph = self.build_train_graph()
+
+        for module_block in graph.model.modules():
+            if isinstance(module_block.origin, TransformerLayer):
+                self.assertTrue(module_block.config.activation_checkpointing)
+                self.assertFalse(module_block.mlp.config.activation_checkpointing)
+
+    @flow.unittest.skip_unless_1n1d()
+    def test_unknown_granularity(self):
+        self.cfg.train.recompute_grad.granularity = "attention"
+        with self.assertRaises(ValueError):
+            self.build_train_graph()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,6 +15,7 @@
 
 import unittest
 
+import numpy as np
 import oneflow as flow
 
 from libai.data import DistTensorData
@@ -69,6 +70,20 @@ class TestMetadata(unittest.TestCase):
         x_stack = DistTensorData.stack(x_list)
         self.assertTrue(x_stack.tensor.shape == (5, 10, 8))
 
+    def test_stack_numpy(self):
+        x_list = [DistTensorData(np.full((10, 8), i, dtype=np.int64)) for i in range(5)]
+
+        x_list.append(DistTensorData(flow.ones(10, 8, dtype=flow.long)))  # type mismatch
+        with self.assertRaises(Exception):
+            DistTensorData.stack(x_list)
+        x_list.pop(-1)
+
+        x_stack = DistTensorData.stack(x_list)
+        self.assertTrue(isinstance(x_stack.tensor, flow.Tensor))
+        self.assertEqual(x_stack.tensor.dtype, flow.int64)
+        self.assertTrue(x_stack.tensor.shape == (5, 10, 8))
+        self.assertTrue(np.array_equal(x_stack.tensor.numpy()[:, 0, 0], np.arange(5)))
+
 
 if __name__ == "__main__":
     unittest.main()